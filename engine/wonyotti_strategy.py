@@ -1,5 +1,6 @@
 import sys
 import json
+import math
 import pandas as pd
 import numpy as np
 
@@ -7,6 +8,7 @@ import numpy as np
 CONFIG = {
     "RSI_PERIOD": 14,
     "VOLUME_MA_PERIOD": 20,
+    "Z_SCORE_PERIOD": 20,
     "Z_SCORE_THRESHOLD": 2.0,
     "FACTOR_WEIGHTS": {
         "vpd": 0.4,       # Volume-Price Divergence
@@ -15,14 +17,37 @@ CONFIG = {
     }
 }
 
+# Signal Logic: (predicate(rsi, vpd, z_score), score, action, reason), first match wins
+SIGNAL_RULES = (
+    # 1. Panic Sell (Buy Signal): RSI < 30 AND High Volume (VPD > 2.0)
+    (lambda rsi, vpd, z: rsi < 30 and vpd > 2.0,
+     90, "STRONG_BUY", "패닉 셀링 포착 (RSI 과매도 + 거래량 급증)"),
+    # 2. Mean Reversion Buy: Z-Score < -2.0 (Oversold)
+    (lambda rsi, vpd, z: z < -float(CONFIG["Z_SCORE_THRESHOLD"]),
+     75, "BUY", "가격 괴리 (20일 이평선 대비 과매도)"),
+    # 3. Momentum Sell: RSI > 70
+    (lambda rsi, vpd, z: rsi > 70,
+     20, "SELL", "과매수 구간 진입 (RSI > 70)"),
+    # 4. Mean Reversion Sell: Z-Score > 2.0
+    (lambda rsi, vpd, z: z > float(CONFIG["Z_SCORE_THRESHOLD"]),
+     30, "SELL", "가격 괴리 (20일 이평선 대비 과열)"),
+)
+DEFAULT_SIGNAL = (None, 50, "HOLD", "관망 (특이 시그널 없음)")
+
 def load_data(raw_data):
     """Load JSON stock data into Pandas DataFrame."""
     try:
-        df = pd.DataFrame(raw_data['candles'])
-        # Ensure correct types
+        candles = raw_data['candles']
         cols = ['open', 'high', 'low', 'close', 'volume']
-        for col in cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+        try:
+            # Build float64 columns straight from the JSON list (no object dtype pass)
+            df = pd.DataFrame({
+                col: np.fromiter((c[col] for c in candles), dtype=np.float64, count=len(candles))
+                for col in cols
+            })
+        except (TypeError, ValueError):
+            # Non-numeric values present: coerce them to NaN, keeping the same columns/dtype
+            df = pd.DataFrame(candles, columns=cols).apply(pd.to_numeric, errors='coerce').astype(np.float64)
         return df
     except Exception as e:
         # If 'candles' key is missing, try loading as list
@@ -34,100 +59,163 @@ def load_data(raw_data):
              sys.exit(1)
 
 def calculate_rsi(series, period=14):
-    """Calculate Relative Strength Index (RSI)."""
-    delta = series.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    """Calculate Relative Strength Index (RSI) with Wilder's smoothing (RMA)."""
+    arr = series.to_numpy(dtype=np.float64)
+    delta = np.diff(arr, prepend=arr[0])
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    # The first row has no delta; leaving it NaN keeps the first `period` rows NaN
+    gain[:1] = np.nan
+    loss[:1] = np.nan
 
-    # Avoid division by zero
-    loss = loss.where(loss != 0, 0.0001)
+    # Wilder's RMA == EMA with alpha = 1/period (TradingView / TA-Lib convention)
+    alpha = 1.0 / period
+    avg_gain = pd.Series(gain, index=series.index).ewm(alpha=alpha, min_periods=period, adjust=False).mean()
+    avg_loss = pd.Series(loss, index=series.index).ewm(alpha=alpha, min_periods=period, adjust=False).mean()
 
-    rs = gain / loss
+    # Avoid division by zero
+    rs = avg_gain / np.maximum(avg_loss, 0.0001)
     return 100 - (100 / (1 + rs))
 
+def rolling_mean_std(values, window):
+    """Rolling mean and sample std over `window` bars, like pandas rolling().
+
+    Vectorised two-pass: the window sums are built by adding the `window`
+    shifted slices of the array. Rows before the first full window, or whose
+    window holds a NaN, are NaN; flat windows get mean == value and std == 0
+    exactly (no rounding noise).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    mean = np.full(n, np.nan)
+    std = np.full(n, np.nan)
+    if n < window:
+        return mean, std
+
+    m = n - window + 1
+    last = values[window - 1:]
+    total = np.zeros(m)
+    flat = np.ones(m, dtype=bool)
+    for k in range(window):
+        shifted = values[k:k + m]
+        total += shifted
+        flat &= shifted == last
+    window_mean = total / window
+
+    sq_sum = np.zeros(m)
+    for k in range(window):
+        dev = values[k:k + m] - window_mean
+        sq_sum += dev * dev
+    window_mean[flat] = last[flat]
+    sq_sum[flat] = 0.0
+
+    mean[window - 1:] = window_mean
+    std[window - 1:] = np.sqrt(sq_sum / (window - 1))
+    return mean, std
+
 def calculate_factors(df):
     """Calculate Alpha Factors based on Wonyotti Strategy."""
+    close = df['close'].to_numpy(dtype=np.float64)
+    volume = df['volume'].to_numpy(dtype=np.float64)
+
     # 1. Volume-Price Divergence (VPD)
-    # High volume with small price movement = Potential Reversal
-    df['volume_ma'] = df['volume'].rolling(window=CONFIG["VOLUME_MA_PERIOD"]).mean()
-    df['price_change_pct'] = df['close'].pct_change()
-    
     # VPD = (Volume / Vol_MA) / (|Price_Change| + epsilon)
-    # High VPD indicates "Effort vs Result" anomaly
+    # High VPD indicates "Effort vs Result" anomaly (high volume, small price move)
     epsilon = 1e-6
+    volume_ma, _ = rolling_mean_std(volume, int(CONFIG["VOLUME_MA_PERIOD"]))
     # Avoid division by zero
-    df['volume_ma'] = df['volume_ma'].where(df['volume_ma'] != 0, 1)
-
-    df['vpd_factor'] = (df['volume'] / df['volume_ma']) / (df['price_change_pct'].abs() + epsilon)
+    volume_ma[volume_ma == 0] = 1.0
+    price_change = np.full(len(close), np.nan)
+    price_change[1:] = close[1:] / close[:-1] - 1.0
+    df['vpd_factor'] = (volume / volume_ma) / (np.abs(price_change) + epsilon)
 
     # 2. Momentum Reversal (RSI)
     df['rsi'] = calculate_rsi(df['close'], int(CONFIG["RSI_PERIOD"]))
 
     # 3. Z-Score Mean Reversion
     # Price deviation from 20-day MA
-    ma_20 = df['close'].rolling(window=20).mean()
-    std_20 = df['close'].rolling(window=20).std()
-    
+    ma_20, std_20 = rolling_mean_std(close, int(CONFIG["Z_SCORE_PERIOD"]))
     # Avoid division by zero
-    std_20 = std_20.where(std_20 != 0, 0.0001)
-
-    df['z_score'] = (df['close'] - ma_20) / std_20
+    std_20[std_20 == 0] = 0.0001
+    df['z_score'] = (close - ma_20) / std_20
 
     return df
 
-def generate_signal(df):
-    """Generate final trading signal based on latest data point."""
-    latest = df.iloc[-1]
-    
-    # Safely get values, handling potential NaNs
-    def safe_get(key, default=0.0):
-        val = latest.get(key)
-        return float(val) if pd.notna(val) else default
-
-    results = {
-        "timestamp": str(latest.name) if isinstance(latest.name, (str, (pd.Timestamp))) else "Latest",
-        "close_price": float(latest['close']),
-        "factors": {
-            "vpd": safe_get('vpd_factor', 0),
-            "rsi": safe_get('rsi', 50),
-            "z_score": safe_get('z_score', 0)
-        },
-        "score": 50,
-        "action": "HOLD",
-        "reason": "Analysis Completed"
-    }
+def compute_latest(close, volume, rsi_period=14, vol_period=20, z_period=20):
+    """Compute (vpd, rsi, z_score) for the latest bar only.
 
-    # Signal Logic
-    # 1. Panic Sell (Buy Signal): RSI < 30 AND High Volume (VPD > 2.0)
-    if results['factors']['rsi'] < 30 and results['factors']['vpd'] > 2.0:
-        results['score'] = 90
-        results['action'] = "STRONG_BUY"
-        results['reason'] = "패닉 셀링 포착 (RSI 과매도 + 거래량 급증)"
-    
-    # 2. Mean Reversion Buy: Z-Score < -2.0 (Oversold)
-    elif results['factors']['z_score'] < -float(CONFIG["Z_SCORE_THRESHOLD"]):
-        results['score'] = 75
-        results['action'] = "BUY"
-        results['reason'] = "가격 괴리 (20일 이평선 대비 과매도)"
+    Uses the same helpers as calculate_factors (rolling_mean_std on the tail
+    windows, calculate_rsi over the full close series), so both paths give the
+    same last-row values. Too-short input yields NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    if len(close) < 2:
+        return np.nan, np.nan, np.nan
 
-    # 3. Momentum Sell: RSI > 70
-    elif results['factors']['rsi'] > 70:
-        results['score'] = 20
-        results['action'] = "SELL"
-        results['reason'] = "과매수 구간 진입 (RSI > 70)"
+    # 1. Volume-Price Divergence
+    vol_ma = rolling_mean_std(volume[-vol_period:], vol_period)[0][-1]
+    if vol_ma == 0:
+        vol_ma = 1.0
+    change = abs(close[-1] / close[-2] - 1.0)
+    vpd = (volume[-1] / vol_ma) / (change + 1e-6)
 
-    # 4. Mean Reversion Sell: Z-Score > 2.0
-    elif results['factors']['z_score'] > float(CONFIG["Z_SCORE_THRESHOLD"]):
-        results['score'] = 30
-        results['action'] = "SELL"
-        results['reason'] = "가격 괴리 (20일 이평선 대비 과열)"
+    # 2. RSI
+    rsi = calculate_rsi(pd.Series(close), rsi_period).iat[-1]
+
+    # 3. Z-Score
+    ma, std = (arr[-1] for arr in rolling_mean_std(close[-z_period:], z_period))
+    if std == 0:
+        std = 0.0001
+    z_score = (close[-1] - ma) / std
 
+    return vpd, rsi, z_score
+
+def generate_signal(df):
+    """Generate final trading signal based on latest data point.
+
+    Uses the factor columns from calculate_factors when present, otherwise
+    computes only the latest bar's factors via compute_latest.
+    """
+    # Read the last values straight from the column arrays (no row Series boxing)
+    close_price = float(df['close'].to_numpy()[-1])
+    if 'vpd_factor' in df.columns:
+        vpd = float(df['vpd_factor'].to_numpy()[-1])
+        rsi = float(df['rsi'].to_numpy()[-1])
+        z_score = float(df['z_score'].to_numpy()[-1])
     else:
-        results['score'] = 50
-        results['action'] = "HOLD"
-        results['reason'] = "관망 (특이 시그널 없음)"
+        vpd, rsi, z_score = (float(v) for v in compute_latest(
+            df['close'].to_numpy(dtype=np.float64),
+            df['volume'].to_numpy(dtype=np.float64),
+            int(CONFIG["RSI_PERIOD"]),
+            int(CONFIG["VOLUME_MA_PERIOD"]),
+            int(CONFIG["Z_SCORE_PERIOD"])
+        ))
+
+    # NaN (warm-up rows / bad data) falls back to neutral values
+    if math.isnan(vpd):
+        vpd = 0
+    if math.isnan(rsi):
+        rsi = 50
+    if math.isnan(z_score):
+        z_score = 0
 
-    return results
+    _, score, action, reason = next(
+        (rule for rule in SIGNAL_RULES if rule[0](rsi, vpd, z_score)), DEFAULT_SIGNAL
+    )
+
+    return {
+        "timestamp": str(df.index[-1]) if isinstance(df.index[-1], (str, (pd.Timestamp))) else "Latest",
+        "close_price": close_price,
+        "factors": {
+            "vpd": vpd,
+            "rsi": rsi,
+            "z_score": z_score
+        },
+        "score": score,
+        "action": action,
+        "reason": reason
+    }
 
 if __name__ == "__main__":
     try:
@@ -168,8 +256,8 @@ if __name__ == "__main__":
              }))
              sys.exit(0)
 
-        df_analyzed = calculate_factors(df)
-        signal = generate_signal(df_analyzed)
+        # Only the latest bar is needed, so skip full-series factor columns
+        signal = generate_signal(df)
 
         print(json.dumps(signal, ensure_ascii=False))
 
@@ -7,179 +7,403 @@ Publog Event Monitoring Bot - Fixed Version
 """
 
 import os
+import atexit
 import json
+import functools
+import html
+import logging
 import re
-import time
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set
-from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
+from typing import List, Dict, Optional, Set, Tuple
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
 import holidays
-import pytz
+import requests
 from dotenv import load_dotenv
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # orjson이 없으면 표준 json으로 동작
+    orjson = None
 
 # .env 파일 로드 (로컬 테스트용)
 load_dotenv()
 
-# Windows 콘솔 인코딩 문제 해결
-def safe_print(text: str = "") -> None:
-    try:
-        print(text)
-    except UnicodeEncodeError:
-        safe_text = text.encode('ascii', 'replace').decode('ascii')
-        print(safe_text)
+log = logging.getLogger("publog")
+
+def setup_logging() -> None:
+    """stdout 로거 설정 (LOG_LEVEL 환경 변수로 레벨 조정, 기본 INFO)"""
+    # Windows 콘솔 인코딩 문제 해결: 출력마다 예외 처리하지 않고 stdout/stderr를 한 번만 재설정
+    for stream in (sys.stdout, sys.stderr):
+        if hasattr(stream, "reconfigure"):
+            stream.reconfigure(encoding="utf-8", errors="replace")
+    logging.basicConfig(stream=sys.stdout, format="%(message)s")
+    # 알 수 없는 레벨 이름(오타 등)이면 INFO로 동작
+    level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+    log.setLevel(level if isinstance(level, int) else logging.INFO)
 
 # [수정] 설정: 환경 변수 이름을 GitHub Secret과 100% 일치시킴
-TARGET_URL = "https://m.publog.co.kr/service_s7/event/list.s2.asp"
+PUBLOG_ORIGIN = "https://m.publog.co.kr"
+TARGET_URL = f"{PUBLOG_ORIGIN}/service_s7/event/list.s2.asp"
 STATE_FILE = Path("data/events.json")
 
+# 알림 색상 및 아이콘 설정: 유형 → (색상, 이모지, 제목)
+NOTIFICATION_STYLES = {
+    "new": (0x5865F2, "🎉", "신규 이벤트"),
+    "modified": (0xFFA500, "🔄", "이벤트 변경"),
+    "none": (0x57F287, "✅", "상태 체크 완료")
+}
+
+# 신규 이벤트가 없을 때 보내는 정기 체크 알림 내용
+HEARTBEAT_EVENTS = [{"title": "감시 중", "url": TARGET_URL}]
+
 # GitHub Actions 환경 변수 우선 로드, 없으면 .env 로드
 DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL") or os.getenv("DISCORD_WEBHOOK_URL")
 
 MAX_NEW_EVENTS = 10
+LIST_CHUNK_SIZE = 16384
+TITLE_CHUNK_SIZE = 8192
+TITLE_FETCH_TIMEOUT = 20  # 상세 페이지 1건당 전체 소요 시간 상한(초, 연결/헤더 대기 포함)
+TITLE_CONNECT_TIMEOUT = 5  # 위 예산 중 연결에 쓸 수 있는 최대 시간(초)
+DISCORD_MAX_FIELDS = 10  # 디스코드 embed 필드 제한
 REQUEST_DELAY = 1.0
+MAX_FETCH_WORKERS = 8
+MAX_REQUESTS_PER_DELAY = 4  # REQUEST_DELAY 초당 허용되는 상세 페이지 요청 수
+
+# 토큰 버킷: 요청마다 슬롯 하나를 쓰고 REQUEST_DELAY 후에 반환
+_REQUEST_SLOTS = threading.BoundedSemaphore(MAX_REQUESTS_PER_DELAY)
+
+KST = ZoneInfo("Asia/Seoul")
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """목록/디스코드 HTTP 요청이 TCP+TLS 연결을 재사용하도록 공용 세션 사용"""
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip, deflate"})
+    # POST는 urllib3 기본 설정상 재시도하지 않으므로 디스코드 알림이 중복 전송되지 않음
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+    atexit.register(session.close)
+    return session
+
+@functools.lru_cache(maxsize=None)
+def get_title_session():
+    """상세 페이지 전용 세션: 재시도가 TITLE_FETCH_TIMEOUT 예산을 몇 배로 늘리지 않도록 재시도 없음"""
+    session = requests.Session()
+    session.headers.update(get_session().headers)
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_FETCH_WORKERS, max_retries=0))
+    atexit.register(session.close)
+    return session
+
+# 상세 페이지 <head>에서 제목을 뽑는 바이트 정규식 (DOM을 만들지 않음)
+_HEAD_END_RE = re.compile(rb'</head\s*>', re.IGNORECASE)
+_OG_TITLE_META_RE = re.compile(rb'<meta\b[^>]*\bproperty\s*=\s*["\']og:title["\'][^>]*>', re.IGNORECASE)
+_CONTENT_ATTR_RE = re.compile(rb'\bcontent\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+_TITLE_TAG_RE = re.compile(rb'<title\b[^>]*>(.*?)</title\s*>', re.IGNORECASE | re.DOTALL)
+_META_CHARSET_RE = re.compile(rb'<meta\b[^>]*\bcharset\s*=\s*["\']?([\w-]+)', re.IGNORECASE)
+
+def _declared_encoding(response) -> Optional[str]:
+    """Content-Type 헤더에 charset이 명시된 경우만 반환 (없으면 lxml이 <meta charset>으로 판별)"""
+    return response.encoding if "charset" in response.headers.get("Content-Type", "") else None
 
 def get_korean_time() -> datetime:
-    kst = pytz.timezone('Asia/Seoul')
-    return datetime.now(kst)
+    return datetime.now(KST)
 
-def is_korean_workday() -> bool:
-    """한국 평일 여부 확인 (테스트 시 이 함수를 건너뛰려면 main을 수정하세요)"""
-    today = get_korean_time()
-    year, weekday = today.year, today.weekday()
-    
-    safe_print(f"[INFO] 현재 한국 시간(KST): {today.strftime('%Y-%m-%d %H:%M:%S')}")
-    
+@functools.lru_cache(maxsize=4)
+def _kr_holidays(year: int):
+    return holidays.KR(years=year)
+
+@functools.lru_cache(maxsize=1)
+def _non_workday_reason(day: date) -> Optional[str]:
+    """쉬는 날이면 사유, 평일이면 None (같은 날짜는 프로세스 내에서 한 번만 계산)"""
     # 주말 체크
-    if weekday >= 5:
-        safe_print(f"[SKIP] ❌ 주말입니다.")
-        return False
-    
+    if day.weekday() >= 5:
+        return "주말입니다."
+
     # 공휴일 체크
-    kr_holidays = holidays.KR(years=year)
-    if today.date() in kr_holidays:
-        safe_print(f"[SKIP] ❌ 공휴일({kr_holidays.get(today.date())})입니다.")
+    holiday_name = _kr_holidays(day.year).get(day)
+    if holiday_name:
+        return f"공휴일({holiday_name})입니다."
+
+    return None
+
+def is_korean_workday(today: Optional[datetime] = None) -> bool:
+    """한국 평일 여부 확인 (테스트 시 이 함수를 건너뛰려면 main을 수정하세요)"""
+    today = today or get_korean_time()
+    
+    log.info("[INFO] 현재 한국 시간(KST): %s", today.strftime('%Y-%m-%d %H:%M:%S'))
+
+    reason = _non_workday_reason(today.date())
+    if reason:
+        log.info("[SKIP] ❌ %s", reason)
         return False
         
     return True
 
-def load_state() -> Dict[str, str]:
-    if not STATE_FILE.exists(): return {}
+def _dump_json(data: Dict, indent: bool = True) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, option=option)
+    if indent:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _load_json(raw: bytes) -> Dict:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def load_state() -> Tuple[Dict[str, str], Dict[str, Dict[str, str]]]:
+    """(이벤트 URL → 제목, URL → HTTP 캐시 검증자(ETag/Last-Modified)) 반환"""
+    if not STATE_FILE.exists(): return {}, {}
     try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data.get("events", {})
-    except: return {}
+        data = _load_json(STATE_FILE.read_bytes())
+        return data.get("events", {}), data.get("http_cache", {})
+    except: return {}, {}
 
-def save_state(events: Dict[str, str]) -> None:
+def save_state(events: Dict[str, str], http_cache: Dict[str, Dict[str, str]], now: Optional[datetime] = None) -> None:
     STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    kst_time = get_korean_time()
+    kst_time = now or get_korean_time()
     data = {
         "events": events,
         "last_updated": kst_time.strftime("%Y-%m-%d %H:%M:%S KST"),
-        "total_count": len(events)
+        "total_count": len(events),
+        "http_cache": http_cache
     }
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # 임시 파일에 쓴 뒤 교체 (중간에 실패해도 기존 상태 파일이 깨지지 않음)
+    tmp_file = STATE_FILE.with_suffix(".json.tmp")
+    try:
+        tmp_file.write_bytes(_dump_json(data))
+        os.replace(tmp_file, STATE_FILE)
+    finally:
+        tmp_file.unlink(missing_ok=True)  # 실패 시 임시 파일 정리 (성공 시에는 이미 없음)
+
+def fetch_event_list(http_cache: Dict[str, Dict[str, str]]) -> Optional[List[str]]:
+    """이벤트 URL 목록 조회 (조건부 GET)
 
-def fetch_event_list() -> List[str]:
-    headers = {"User-Agent": "Mozilla/5.0"}
+    목록 페이지가 지난 실행 이후 바뀌지 않았으면(304) None을 반환합니다.
+    새 ETag/Last-Modified는 http_cache에 기록됩니다.
+    """
     try:
-        response = requests.get(TARGET_URL, headers=headers, timeout=30)
-        soup = BeautifulSoup(response.text, "lxml")
-        pattern = re.compile(r'/service_s7/event/[^"\']*m_evt\.asp[^"\']*')
-        links = soup.find_all("a", href=pattern)
-        urls = [f"https://m.publog.co.kr{l.get('href')}" if l.get('href').startswith("/") else l.get('href') for l in links]
+        validators = http_cache.get(TARGET_URL, {})
+        headers = {}
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        urls = []
+        with get_session().get(TARGET_URL, headers=headers, timeout=30, stream=True) as response:
+            if response.status_code == 304:
+                return None
+
+            validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            if any(validators.values()):
+                http_cache[TARGET_URL] = validators
+            else:
+                http_cache.pop(TARGET_URL, None)
+
+            # 받는 대로 파서에 흘려보내고 <a> 태그가 닫힐 때마다 링크만 수집 (디코딩은 lxml(C)에 맡김)
+            parser = etree.HTMLPullParser(events=("end",), tag="a", encoding=_declared_encoding(response))
+
+            def collect_links() -> None:
+                for _, elem in parser.read_events():
+                    href = elem.get("href") or ""
+                    if "/service_s7/event/" in href and "m_evt.asp" in href:
+                        urls.append(f"{PUBLOG_ORIGIN}{href}" if href.startswith("/") else href)
+                    elem.clear()
+
+            for chunk in response.iter_content(LIST_CHUNK_SIZE):
+                parser.feed(chunk)
+                collect_links()
+            parser.close()
+            collect_links()  # 문서 끝에서 닫힌 태그
         return list(dict.fromkeys(urls))
     except Exception as e:
-        safe_print(f"[ERROR] Fetch failed: {e}")
+        log.error("[ERROR] Fetch failed: %s", e)
         return []
 
+def _extract_title(head: bytes, encoding: Optional[str]) -> Optional[str]:
+    """<head> 바이트에서 og:title(없으면 <title>) 추출"""
+    raw = None
+    meta = _OG_TITLE_META_RE.search(head)
+    if meta:
+        content = _CONTENT_ATTR_RE.search(meta.group(0))
+        raw = content.group(2) if content else None
+    if raw is None:
+        title = _TITLE_TAG_RE.search(head)
+        raw = title.group(1) if title else None
+    if raw is None:
+        return None
+
+    if not encoding:
+        charset = _META_CHARSET_RE.search(head)
+        encoding = charset.group(1).decode("ascii") if charset else "utf-8"
+    try:
+        text = raw.decode(encoding, "replace")
+    except LookupError:  # 알 수 없는 charset 이름
+        text = raw.decode("utf-8", "replace")
+    return html.unescape(text).strip()
+
 def fetch_event_title(url: str) -> str:
+    """상세 페이지의 <head>까지만 내려받아 og:title(없으면 <title>)을 추출"""
     try:
-        response = requests.get(url, timeout=20)
-        soup = BeautifulSoup(response.text, "lxml")
-        og_title = soup.find("meta", property="og:title")
-        return og_title["content"].strip() if og_title else url.split("/")[-1]
+        deadline = time.monotonic() + TITLE_FETCH_TIMEOUT
+        head = bytearray()
+        # 연결 + 응답 헤더 대기도 같은 예산 안에서 나눠 씀
+        connect_timeout = min(TITLE_CONNECT_TIMEOUT, TITLE_FETCH_TIMEOUT / 2)
+        timeout = (connect_timeout, TITLE_FETCH_TIMEOUT - connect_timeout)
+        with get_title_session().get(url, timeout=timeout, stream=True) as response:
+            encoding = _declared_encoding(response)
+            raw = response.raw
+            sock = getattr(getattr(raw, "connection", None), "sock", None)
+            while True:
+                # 느리게 흘려보내는 서버가 워커를 붙잡지 않도록 소켓 대기 시간을 남은 예산으로 줄임
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break  # 받은 데까지만 사용
+                if sock is not None:
+                    sock.settimeout(remaining)
+                try:
+                    # read1: 청크가 다 찰 때까지 기다리지 않고 도착한 만큼만 반환
+                    chunk = raw.read1(TITLE_CHUNK_SIZE, decode_content=True)
+                except ReadTimeoutError:
+                    break
+                if not chunk:
+                    break
+                head += chunk
+                # 청크 경계에 걸친 </head>도 찾도록 직전 몇 바이트부터 검색
+                if _HEAD_END_RE.search(head, max(0, len(head) - len(chunk) - 8)):
+                    break  # </head> 이후 본문은 읽지 않음
+        title = _extract_title(bytes(head), encoding)
+        return title if title is not None else url.split("/")[-1]
     except: return url
 
-def send_discord_notification(events: List[Dict[str, str]], notification_type: str = "new") -> bool:
+def _paced_fetch_event_title(url: str) -> str:
+    _REQUEST_SLOTS.acquire()
+    timer = threading.Timer(REQUEST_DELAY, _REQUEST_SLOTS.release)
+    timer.daemon = True
+    timer.start()
+    return fetch_event_title(url)
+
+def fetch_event_titles(urls: List[str]) -> Dict[str, str]:
+    """상세 페이지 제목을 병렬로 조회 (서버 부하는 토큰 버킷으로 제한)"""
+    if not urls:
+        return {}
+    get_title_session()  # 워커들이 동시에 세션을 만들지 않도록 미리 생성
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(urls))) as executor:
+        return dict(zip(urls, executor.map(_paced_fetch_event_title, urls)))
+
+def send_discord_notification(events: List[Dict[str, str]], notification_type: str = "new", now: Optional[datetime] = None) -> bool:
     # [검증] 웹훅 URL이 비어있는지 마지막으로 체크
     if not DISCORD_WEBHOOK_URL:
-        safe_print("[CRITICAL] DISCORD_WEBHOOK_URL이 설정되지 않았습니다. GitHub Secrets를 확인하세요.")
+        log.critical("[CRITICAL] DISCORD_WEBHOOK_URL이 설정되지 않았습니다. GitHub Secrets를 확인하세요.")
         return False
     
-    # 알림 색상 및 아이콘 설정
-    config = {
-        "new": (0x5865F2, "🎉", "신규 이벤트"),
-        "modified": (0xFFA500, "🔄", "이벤트 변경"),
-        "none": (0x57F287, "✅", "상태 체크 완료")
-    }
-    color, emoji, title_text = config.get(notification_type, config["new"])
+    color, emoji, title_text = NOTIFICATION_STYLES.get(notification_type, NOTIFICATION_STYLES["new"])
     
-    fields = [{"name": f"{emoji} {idx}. {e['title']}", "value": f"[링크 바로가기]({e['url']})", "inline": False} for idx, e in enumerate(events, 1)]
+    # 전송되지 않는 필드는 만들지 않도록 먼저 자름
+    fields = [{"name": f"{emoji} {idx}. {e['title']}", "value": f"[링크 바로가기]({e['url']})", "inline": False} for idx, e in enumerate(events[:DISCORD_MAX_FIELDS], 1)]
     
     payload = {
         "embeds": [{
             "title": f"{emoji} {title_text}",
             "color": color,
-            "fields": fields[:10], # 디스코드 제한
-            "footer": {"text": f"KST {get_korean_time().strftime('%Y-%m-%d %H:%M')}"}
+            "fields": fields,
+            "footer": {"text": f"KST {(now or get_korean_time()).strftime('%Y-%m-%d %H:%M')}"}
         }]
     }
     
     try:
-        res = requests.post(DISCORD_WEBHOOK_URL, json=payload, timeout=10)
+        res = get_session().post(
+            DISCORD_WEBHOOK_URL,
+            data=_dump_json(payload, indent=False),
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
         res.raise_for_status()
         return True
     except Exception as e:
-        safe_print(f"[ERROR] Discord 전송 실패: {e}")
+        log.error("[ERROR] Discord 전송 실패: %s", e)
         return False
 
 def main():
-    safe_print("=" * 40)
-    safe_print("🚀 Publog Bot 실행 시작")
+    log.info("=" * 40)
+    log.info("🚀 Publog Bot 실행 시작")
     
     # [핵심 수정] 환경 변수 값 존재 여부 즉시 확인
     if not DISCORD_WEBHOOK_URL:
-        safe_print("❌ 에러: DISCORD_WEBHOOK_URL을 찾을 수 없습니다.")
+        log.error("❌ 에러: DISCORD_WEBHOOK_URL을 찾을 수 없습니다.")
         sys.exit(1)
 
+    # 실행 전체에서 같은 한국 시각을 사용
+    now = get_korean_time()
+
     # 평일 검증 로직 (필요 시 주석 처리하여 강제 실행 가능)
-    if not is_korean_workday():
-        safe_print("😴 오늘은 쉬는 날입니다. 실행을 종료합니다.")
+    if not is_korean_workday(now):
+        log.info("😴 오늘은 쉬는 날입니다. 실행을 종료합니다.")
         # return  # 주말에도 테스트하려면 이 줄을 주석 처리하세요.
 
     # 실행 로직
-    prev_events = load_state()
-    current_urls = fetch_event_list()
+    prev_events, http_cache = load_state()
+    prev_http_cache = {url: dict(validators) for url, validators in http_cache.items()}
+    current_urls = fetch_event_list(http_cache)
+
+    if current_urls is None:
+        # 목록이 그대로면 신규 이벤트도 없으므로 비교/제목 조회/상태 저장을 모두 건너뜀
+        log.info("[INFO] 이벤트 목록 페이지 변경 없음 (304 Not Modified)")
+        if prev_events:
+            log.info("✨ 새로운 이벤트가 없습니다.")
+            send_discord_notification(HEARTBEAT_EVENTS, "none", now)
+            log.info("✅ 작업 완료")
+            return
+        current_urls = []
     
     if not current_urls:
-        safe_print("📭 진행 중인 이벤트를 찾지 못했습니다.")
+        log.info("📭 진행 중인 이벤트를 찾지 못했습니다.")
         return
 
-    new_urls = [url for url in current_urls if url not in prev_events]
-    new_event_details = []
-    
-    for url in new_urls[:MAX_NEW_EVENTS]:
-        title = fetch_event_title(url)
-        new_event_details.append({"title": title, "url": url})
-        time.sleep(REQUEST_DELAY)
-
-    # 알림 전송
-    if new_event_details:
-        send_discord_notification(new_event_details, "new")
-    else:
-        safe_print("✨ 새로운 이벤트가 없습니다.")
-        # 정기 체크 알림 (선택 사항)
-        send_discord_notification([{"title": "감시 중", "url": TARGET_URL}], "none")
-
-    # 상태 업데이트 및 저장
-    updated_state = {url: fetch_event_title(url) if url in new_urls else prev_events.get(url) for url in current_urls}
-    save_state(updated_state)
-    safe_print("✅ 작업 완료")
+    # 한 번의 순회로 기존 이벤트는 상태에 옮기고 신규 URL만 따로 모음
+    # (신규 URL은 자리만 잡아 두어 상태 파일이 목록 페이지 순서를 유지하도록 함)
+    updated_state = {}
+    new_urls = []
+    for url in current_urls:
+        if url in prev_events:
+            updated_state[url] = prev_events[url]
+        else:
+            updated_state[url] = None
+            new_urls.append(url)
+
+    # 신규 URL 제목은 한 번에 병렬 조회하고, 알림에는 앞의 MAX_NEW_EVENTS건만 사용
+    new_titles = fetch_event_titles(new_urls)
+    new_event_details = [{"title": new_titles[url], "url": url} for url in new_urls[:MAX_NEW_EVENTS]]
+
+    # 알림 전송은 백그라운드에서 진행하고, 그동안 상태 파일을 갱신
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if new_event_details:
+            notification = executor.submit(send_discord_notification, new_event_details, "new", now)
+        else:
+            log.info("✨ 새로운 이벤트가 없습니다.")
+            # 정기 체크 알림 (선택 사항)
+            notification = executor.submit(send_discord_notification, HEARTBEAT_EVENTS, "none", now)
+
+        # 상태 업데이트 및 저장 (이미 조회한 제목으로 자리를 채움, 네트워크 요청 없음)
+        updated_state.update(new_titles)
+        # 변경이 없으면 저장하지 않음 (워크플로가 불필요한 커밋을 만들지 않도록)
+        if updated_state == prev_events and http_cache == prev_http_cache:
+            log.info("[INFO] 변경 사항 없음 - 상태 파일 저장 생략")
+        else:
+            save_state(updated_state, http_cache, now)
+
+        notification.result()
+    log.info("✅ 작업 완료")
 
 if __name__ == "__main__":
+    setup_logging()
     main()